@@ -51,7 +51,8 @@ forward = mne.read_forward_solution(fwd_fname)
 # %%
 # Auxiliary function to run the solver
 
-def apply_solver(solver, evoked, forward, noise_cov, loose=0.2, depth=0.8):
+def apply_solver(solver, evoked, forward, noise_cov, loose=0.2, depth=0.8,
+                 cache_dir=None):
     """Call a custom solver on evoked data.
 
     This function does all the necessary computation:
@@ -87,6 +88,11 @@ def apply_solver(solver, evoked, forward, noise_cov, loose=0.2, depth=0.8):
         space and set to 1.0 for volumic or discrete source space.
     depth : None | float in [0, 1]
         Depth weighting coefficients. If None, no depth weighting is performed.
+    cache_dir : None | path-like
+        Folder in which to cache the depth weighted and whitened gain matrix
+        with :class:`joblib.Memory`, to avoid recomputing it when trying out
+        several solvers on the same data. If None (default), nothing is
+        cached.
 
     Returns
     -------
@@ -100,17 +106,21 @@ def apply_solver(solver, evoked, forward, noise_cov, loose=0.2, depth=0.8):
 
     all_ch_names = evoked.ch_names
 
+    prepare_gain = _prepare_gain
+    if cache_dir is not None:
+        from joblib import Memory
+        prepare_gain = Memory(cache_dir, verbose=0).cache(_prepare_gain)
+
     # Handle depth weighting and whitening (here is no weights)
-    forward, gain, gain_info, whitener, source_weighting, mask = _prepare_gain(
+    forward, gain, gain_info, whitener, source_weighting, mask = prepare_gain(
         forward, evoked.info, noise_cov, pca=False, depth=depth,
         loose=loose, weights=None, weights_min=None, rank=None)
 
     # Select channels of interest
     sel = [all_ch_names.index(name) for name in gain_info['ch_names']]
-    M = evoked.data[sel]
 
     # Whiten data
-    M = np.dot(whitener, M)
+    M = np.dot(whitener, evoked.data[sel])
 
     n_orient = 1 if is_fixed_orient(forward) else 3
     X, active_set = solver(M, gain, n_orient)
@@ -150,17 +160,23 @@ def solver(M, G, n_orient):
         We have ``X_full[active_set] == X`` where X_full is the full X matrix
         such that ``M = G X_full``.
     """
-    inner = np.dot(G, G.T)
-    trace = np.trace(inner)
-    K = linalg.solve(inner + 4e-6 * trace * np.eye(G.shape[0]), G).T
-    K /= np.linalg.norm(K, axis=1)[:, None]
+    # Apply the ridge inverse in closed form from the SVD of G, which avoids
+    # forming G @ G.T and solving a dense system: with G = U diag(s) Vt,
+    # G.T @ inv(G @ G.T + lambda I) = Vt.T @ diag(s / (s ** 2 + lambda)) @ U.T
+    U, s, Vt = linalg.svd(G, full_matrices=False)
+    lambda2 = 4e-6 * np.sum(s ** 2)  # trace(G @ G.T) == sum(s ** 2)
+    K = np.dot(Vt.T * (s / (s ** 2 + lambda2)), U.T)
+    K /= np.linalg.norm(K, axis=1, keepdims=True)
+
     X = np.dot(K, M)
+    power = np.einsum('ij,ij->i', X, X)
 
-    indices = np.argsort(np.sum(X ** 2, axis=1))[-10:]
+    # Only the 10 strongest dipoles are needed, and in no particular order
+    indices = np.argpartition(power, -10)[-10:]
+    # Activate all orientations of the locations of the strongest dipoles
+    idx = (indices // n_orient)[:, None] * n_orient + np.arange(n_orient)
     active_set = np.zeros(G.shape[1], dtype=bool)
-    for idx in indices:
-        idx -= idx % n_orient
-        active_set[idx:idx + n_orient] = True
+    active_set[idx.ravel()] = True
     X = X[active_set]
     return X, active_set
 
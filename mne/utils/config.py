@@ -5,16 +5,18 @@
 # License: BSD-3-Clause
 
 import atexit
-from functools import partial
+from functools import lru_cache, partial
 import json
 import os
 import os.path as op
 import platform
 import shutil
+from stat import S_ISREG
 import subprocess
 import sys
 import tempfile
 import re
+from uuid import uuid4
 
 from .check import (_validate_type, _check_qt_version, _check_option,
                     _check_fname)
@@ -24,6 +26,8 @@ from ._logging import warn, logger
 
 
 _temp_home_dir = None
+# Last parsed config file, reused for as long as the file does not change
+_config_cache = dict(path=None, stat=None, config=None)
 
 
 def set_cache_dir(cache_dir):
@@ -149,23 +153,52 @@ known_config_wildcards = (
     'MNE_NIRS',
 )
 
+# Frozen versions of the above for fast key lookups
+_known_config_types_set = frozenset(known_config_types)
+_known_config_wildcards = tuple(known_config_wildcards)
+
 
 def _load_config(config_path, raise_error=False):
     """Safely load a config file."""
-    with open(config_path, 'r') as fid:
-        try:
-            config = json.load(fid)
-        except ValueError:
-            # No JSON object could be decoded --> corrupt file?
-            msg = ('The MNE-Python config file (%s) is not a valid JSON '
-                   'file and might be corrupted' % config_path)
-            if raise_error:
-                raise RuntimeError(msg)
-            warn(msg)
-            config = dict()
+    # like op.isfile, treat anything but an accessible regular file as missing
+    try:
+        stat = os.stat(config_path)
+    except OSError as exc:
+        raise FileNotFoundError(f'Cannot access: {config_path}') from exc
+    if not S_ISREG(stat.st_mode):
+        raise FileNotFoundError(f'Not a regular file: {config_path}')
+    stat = (stat.st_mtime_ns, stat.st_size)
+    if _config_cache['path'] == config_path and \
+            _config_cache['stat'] == stat:
+        return _config_cache['config'].copy()
+    with open(config_path, 'rb') as fid:
+        contents = fid.read()
+    try:
+        config = _get_json_loads()(contents)
+    except ValueError:
+        # No JSON object could be decoded --> corrupt file?
+        msg = ('The MNE-Python config file (%s) is not a valid JSON '
+               'file and might be corrupted' % config_path)
+        if raise_error:
+            raise RuntimeError(msg)
+        warn(msg)
+        config = dict()
+    else:
+        _config_cache.update(
+            path=config_path, stat=stat, config=config.copy())
     return config
 
 
+@lru_cache(maxsize=1)
+def _get_json_loads():
+    # orjson is faster if available; its errors subclass ValueError, too
+    try:
+        from orjson import loads
+    except ImportError:
+        loads = json.loads
+    return loads
+
+
 def get_config_path(home_dir=None):
     r"""Get path to standard mne-python config file.
 
@@ -233,16 +266,16 @@ def get_config(key=None, default=None, raise_error=False, home_dir=None,
 
     # second, look for it in mne-python config file
     config_path = get_config_path(home_dir=home_dir)
-    if not op.isfile(config_path):
-        config = {}
-    else:
+    try:
         config = _load_config(config_path)
+    except FileNotFoundError:
+        config = {}
 
     if key is None:
         # update config with environment variables
         if use_env:
-            env_keys = (set(config).union(known_config_types).
-                        intersection(os.environ))
+            env_keys = (_known_config_types_set | config.keys()) & \
+                os.environ.keys()
             config.update({key: os.environ[key] for key in env_keys})
         return config
     elif raise_error is True and key not in config:
@@ -290,15 +323,15 @@ def set_config(key, value, home_dir=None, set_env=True):
     if value is not None:
         value = str(value)
 
-    if key not in known_config_types and not \
-            any(key.startswith(k) for k in known_config_wildcards):
+    if key not in _known_config_types_set and \
+            not key.startswith(_known_config_wildcards):
         warn('Setting non-standard config type: "%s"' % key)
 
     # Read all previous values
     config_path = get_config_path(home_dir=home_dir)
-    if op.isfile(config_path):
+    try:
         config = _load_config(config_path, raise_error=True)
-    else:
+    except FileNotFoundError:
         config = dict()
         logger.info('Attempting to create new mne-python configuration '
                     'file:\n%s' % config_path)
@@ -316,56 +349,89 @@ def set_config(key, value, home_dir=None, set_env=True):
     directory = op.dirname(config_path)
     if not op.isdir(directory):
         os.mkdir(directory)
-    with open(config_path, 'w') as fid:
-        json.dump(config, fid, sort_keys=True, indent=0)
+    # Write to a temporary file first and then move it in place so that
+    # readers never see a partially written file. Resolve symlinks so that
+    # their target gets updated instead of the link being replaced.
+    # Unlike tempfile.mkstemp, os.open lets the umask determine the
+    # permissions of a new file, as plain open() does.
+    real_path = op.realpath(config_path)
+    temp_path = op.join(
+        op.dirname(real_path), f'.mne-python-{uuid4().hex}.json')
+    fd = os.open(temp_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o666)
+    try:
+        with os.fdopen(fd, 'w') as fid:
+            json.dump(config, fid, sort_keys=True, indent=0)
+        if op.isfile(real_path):
+            shutil.copymode(real_path, temp_path)
+        os.replace(temp_path, real_path)
+    except BaseException:
+        if op.isfile(temp_path):
+            os.remove(temp_path)
+        raise
+    # The .mne folder might have just been created
+    _get_default_home_dir.cache_clear()
+    _config_cache.update(path=None, stat=None, config=None)
+
+
+# Environment variables that determine the default location of the .mne folder
+_home_dir_env_vars = ('MNE_DONTWRITE_HOME', 'APPDATA', 'USERPROFILE', 'HOME')
 
 
 def _get_extra_data_path(home_dir=None):
     """Get path to extra data (config, tables, etc.)."""
-    global _temp_home_dir
     if home_dir is None:
         home_dir = os.environ.get('_MNE_FAKE_HOME_DIR')
     if home_dir is None:
-        # this has been checked on OSX64, Linux64, and Win32
-        if 'nt' == os.name.lower():
-            APPDATA_DIR = os.getenv('APPDATA')
-            USERPROFILE_DIR = os.getenv('USERPROFILE')
-            if (
-                APPDATA_DIR is not None
-                and op.isdir(op.join(APPDATA_DIR, '.mne'))  # backward-compat
-            ):
-                home_dir = APPDATA_DIR
-            elif USERPROFILE_DIR is not None:
-                home_dir = USERPROFILE_DIR
-            else:
-                raise FileNotFoundError(
-                    "The USERPROFILE environment variable is not set, cannot "
-                    "determine the location of the MNE-Python configuration "
-                    "folder"
-                )
-            del APPDATA_DIR, USERPROFILE_DIR
-        else:
-            # This is a more robust way of getting the user's home folder on
-            # Linux platforms (not sure about OSX, Unix or BSD) than checking
-            # the HOME environment variable. If the user is running some sort
-            # of script that isn't launched via the command line (e.g. a script
-            # launched via Upstart) then the HOME environment variable will
-            # not be set.
-            if os.getenv('MNE_DONTWRITE_HOME', '') == 'true':
-                if _temp_home_dir is None:
-                    _temp_home_dir = tempfile.mkdtemp()
-                    atexit.register(partial(shutil.rmtree, _temp_home_dir,
-                                            ignore_errors=True))
-                home_dir = _temp_home_dir
-            else:
-                home_dir = os.path.expanduser('~')
+        # This is called by every get_config call and needs file system
+        # access on Windows, so cache it as long as the environment variables
+        # it depends on do not change
+        home_dir = _get_default_home_dir(
+            tuple(os.environ.get(key) for key in _home_dir_env_vars))
+    return op.join(home_dir, '.mne')
 
-        if home_dir is None:
-            raise ValueError('mne-python config file path could '
-                             'not be determined, please report this '
-                             'error to mne-python developers')
 
-    return op.join(home_dir, '.mne')
+@lru_cache(maxsize=4)
+def _get_default_home_dir(env):
+    global _temp_home_dir
+    # this has been checked on OSX64, Linux64, and Win32
+    if 'nt' == os.name.lower():
+        APPDATA_DIR = os.getenv('APPDATA')
+        USERPROFILE_DIR = os.getenv('USERPROFILE')
+        if (
+            APPDATA_DIR is not None
+            and op.isdir(op.join(APPDATA_DIR, '.mne'))  # backward-compat
+        ):
+            home_dir = APPDATA_DIR
+        elif USERPROFILE_DIR is not None:
+            home_dir = USERPROFILE_DIR
+        else:
+            raise FileNotFoundError(
+                "The USERPROFILE environment variable is not set, cannot "
+                "determine the location of the MNE-Python configuration "
+                "folder"
+            )
+        del APPDATA_DIR, USERPROFILE_DIR
+    else:
+        # This is a more robust way of getting the user's home folder on
+        # Linux platforms (not sure about OSX, Unix or BSD) than checking
+        # the HOME environment variable. If the user is running some sort
+        # of script that isn't launched via the command line (e.g. a script
+        # launched via Upstart) then the HOME environment variable will
+        # not be set.
+        if os.getenv('MNE_DONTWRITE_HOME', '') == 'true':
+            if _temp_home_dir is None:
+                _temp_home_dir = tempfile.mkdtemp()
+                atexit.register(partial(shutil.rmtree, _temp_home_dir,
+                                        ignore_errors=True))
+            home_dir = _temp_home_dir
+        else:
+            home_dir = os.path.expanduser('~')
+
+    if home_dir is None:
+        raise ValueError('mne-python config file path could '
+                         'not be determined, please report this '
+                         'error to mne-python developers')
+    return home_dir
 
 
 def get_subjects_dir(subjects_dir=None, raise_error=False):
@@ -426,19 +492,25 @@ def _get_stim_channel(stim_channel, info, raise_error=True):
             _validate_type(channel, 'str', "Each provided stim channel")
         return stim_channel
 
+    # Read the config file only once for all MNE_STIM_CHANNEL* keys, letting
+    # environment variables take precedence as get_config does
+    config = get_config(use_env=False)
+    config.update((key, val) for key, val in os.environ.items()
+                  if key.startswith('MNE_STIM_CHANNEL'))
+    ch_names = set(info['ch_names'])
     stim_channel = list()
     ch_count = 0
-    ch = get_config('MNE_STIM_CHANNEL')
-    while ch is not None and ch in info['ch_names']:
+    ch = config.get('MNE_STIM_CHANNEL')
+    while ch is not None and ch in ch_names:
         stim_channel.append(ch)
         ch_count += 1
-        ch = get_config('MNE_STIM_CHANNEL_%d' % ch_count)
+        ch = config.get('MNE_STIM_CHANNEL_%d' % ch_count)
     if ch_count > 0:
         return stim_channel
 
-    if 'STI101' in info['ch_names']:  # combination channel for newer systems
+    if 'STI101' in ch_names:  # combination channel for newer systems
         return ['STI101']
-    if 'STI 014' in info['ch_names']:  # for older systems
+    if 'STI 014' in ch_names:  # for older systems
         return ['STI 014']
 
     from ..io.pick import pick_types
@@ -488,15 +560,20 @@ print(gi.version); \
 print(gi.renderer)"""
 
 
+@lru_cache(maxsize=1)
 def _get_gpu_info():
     # Once https://github.com/pyvista/pyvista/pull/2250 is merged and PyVista
-    # does a release, we can triage based on version > 0.33.2
+    # does a release, we can triage based on version > 0.33.2. Until then
+    # GPUInfo has to run in a separate process, so only do it once.
     proc = subprocess.run(
         [sys.executable, '-c', _gpu_cmd], check=False, capture_output=True)
     out = proc.stdout.decode().strip().replace('\r', '').split('\n')
     if proc.returncode or len(out) != 2:
         return None, None
-    return out
+    return tuple(out)
+
+
+_darwin_re = re.compile('Darwin-.*?-(.*)')
 
 
 def sys_info(fid=None, show_paths=False, *, dependencies='user'):
@@ -558,9 +635,9 @@ def sys_info(fid=None, show_paths=False, *, dependencies='user'):
         # platform.mac_ver() if we're on Darwin, so we don't get a nice macOS
         # version number. Therefore, let's do this manually here.
         macos_ver = platform.mac_ver()[0]
-        macos_architecture = re.findall('Darwin-.*?-(.*)', platform_str)
-        if macos_architecture:
-            macos_architecture = macos_architecture[0]
+        macos_architecture = _darwin_re.search(platform_str)
+        if macos_architecture is not None:
+            macos_architecture = macos_architecture.group(1)
             platform_str = f'macOS-{macos_ver}-{macos_architecture}'
         del macos_ver, macos_architecture
 
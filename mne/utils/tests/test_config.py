@@ -68,6 +68,15 @@ def test_config(tmp_path):
     with pytest.warns(RuntimeWarning, match='non-standard'):
         pytest.raises(RuntimeError, set_config, key, 'true', home_dir=tempdir)
 
+    # a folder in place of the config file is ignored as before
+    folder_home = tmp_path / 'folder_home'
+    (folder_home / '.mne' / 'mne-python.json').mkdir(parents=True)
+    assert get_config(home_dir=str(folder_home), use_env=False) == {}
+    # so is a home folder that is actually a file
+    file_home = tmp_path / 'file_home'
+    file_home.write_text('')
+    assert get_config(home_dir=str(file_home), use_env=False) == {}
+
     # degenerate conditions
     pytest.raises(ValueError, set_memmap_min_size, 1)
     pytest.raises(ValueError, set_memmap_min_size, 'foo')
@@ -111,3 +120,85 @@ def test_get_subjects_dir(tmp_path, monkeypatch):
     monkeypatch.setenv('HOME', str(tmp_path))
     monkeypatch.setenv('USERPROFILE', str(tmp_path))  # Windows
     assert get_subjects_dir('~/foo') == str(subjects_dir)
+
+
+def test_config_path_env(tmp_path, monkeypatch):
+    """Test that the cached config path follows environment changes."""
+    for name in ('foo', 'bar', 'foo'):
+        monkeypatch.setenv('_MNE_FAKE_HOME_DIR', str(tmp_path / name))
+        assert get_config_path() == str(
+            tmp_path / name / '.mne' / 'mne-python.json')
+    monkeypatch.delenv('_MNE_FAKE_HOME_DIR')
+    monkeypatch.delenv('MNE_DONTWRITE_HOME', raising=False)
+    monkeypatch.setenv('HOME', str(tmp_path))
+    monkeypatch.setenv('USERPROFILE', str(tmp_path))  # Windows
+    monkeypatch.delenv('APPDATA', raising=False)
+    assert get_config_path() == str(tmp_path / '.mne' / 'mne-python.json')
+
+
+def test_config_cache(tmp_path):
+    """Test that the cached config follows changes to the file."""
+    tempdir = str(tmp_path)
+    key = 'MNE_LOGGING_LEVEL'
+    set_config(key, 'info', home_dir=tempdir, set_env=False)
+    assert get_config(key, home_dir=tempdir, use_env=False) == 'info'
+    # the file is written atomically without leaving temporary files
+    assert os.listdir(tmp_path / '.mne') == ['mne-python.json']
+    # the returned dict must not modify the cache
+    get_config(home_dir=tempdir, use_env=False)[key] = 'foo'
+    assert get_config(key, home_dir=tempdir, use_env=False) == 'info'
+    # external modification of the file, with the same size
+    json_fname = get_config_path(home_dir=tempdir)
+    with open(json_fname, 'r') as fid:
+        contents = fid.read()
+    with open(json_fname, 'w') as fid:
+        fid.write(contents.replace('"info"', '"warn"'))
+    stat = os.stat(json_fname)
+    os.utime(json_fname, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    assert get_config(key, home_dir=tempdir, use_env=False) == 'warn'
+
+
+def test_get_stim_channel(tmp_path, monkeypatch):
+    """Test stim channel defaults from the config and environment."""
+    from mne import create_info
+    info = create_info(['STI 014', 'STI 015', 'STI 016', 'MEG 0111'],
+                       1000., ['stim', 'stim', 'stim', 'mag'])
+    monkeypatch.setenv('_MNE_FAKE_HOME_DIR', str(tmp_path))
+    for key in ('MNE_STIM_CHANNEL', 'MNE_STIM_CHANNEL_1',
+                'MNE_STIM_CHANNEL_2'):
+        monkeypatch.delenv(key, raising=False)
+    assert _get_stim_channel(None, info) == ['STI 014']
+    set_config('MNE_STIM_CHANNEL', 'STI 015', set_env=False)
+    set_config('MNE_STIM_CHANNEL_1', 'STI 016', set_env=False)
+    assert _get_stim_channel(None, info) == ['STI 015', 'STI 016']
+    # environment variables take precedence
+    monkeypatch.setenv('MNE_STIM_CHANNEL_1', 'STI 014')
+    assert _get_stim_channel(None, info) == ['STI 015', 'STI 014']
+    monkeypatch.setenv('MNE_STIM_CHANNEL_1', 'foo')
+    assert _get_stim_channel(None, info) == ['STI 015']
+    assert _get_stim_channel('STI 016', info) == ['STI 016']
+
+
+def test_config_write(tmp_path):
+    """Test that writing the config keeps symlinks and permissions."""
+    key = 'MNE_LOGGING_LEVEL'
+    home_dir = tmp_path / 'home'
+    home_dir.mkdir()
+    set_config(key, 'info', home_dir=str(home_dir), set_env=False)
+    json_fname = Path(get_config_path(home_dir=str(home_dir)))
+    if os.name != 'nt':
+        umask = os.umask(0)
+        os.umask(umask)
+        assert json_fname.stat().st_mode & 0o777 == 0o666 & ~umask
+    # a symlinked config file gets its target updated
+    target = tmp_path / 'dotfiles' / 'mne-python.json'
+    target.parent.mkdir()
+    json_fname.rename(target)
+    try:
+        json_fname.symlink_to(target)
+    except OSError:  # e.g., no privileges on Windows
+        pytest.skip('symlinks not supported')
+    set_config(key, 'warn', home_dir=str(home_dir), set_env=False)
+    assert json_fname.is_symlink()
+    assert get_config(key, home_dir=str(home_dir), use_env=False) == 'warn'
+    assert sorted(os.listdir(target.parent)) == ['mne-python.json']